@@ -8,6 +8,7 @@
   close_hk      - 港股收盘后：同上
   close_us      - 美股收盘后：同上
   close_crypto  - 加密货币每日快照检测：同上
+  close_all     - A股/港股/美股依次收盘检测，合并为一条推送
   daily_a       - A股日报（收盘后1小时）：大盘指数 + 个股股价/涨跌/量比 + Qwen新闻摘要
   daily_hk      - 港股日报：同上
   daily_us      - 美股日报：同上
@@ -22,10 +23,18 @@ import os
 import sys
 import json
 import re
+import time
+import heapq
+import shutil
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import numpy as np
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import yfinance as yf
 
 # 在 akshare 创建 Session 之前注入浏览器 UA，避免东方财富 API 拒绝连接
@@ -41,10 +50,12 @@ def _patched_session_init(self, *args, **kwargs):
     })
 requests.Session.__init__ = _patched_session_init
 
-import akshare as ak
-import openai
+# akshare / openai 导入较重，且只有A股新闻、日报摘要才用到，均在首次使用时再导入（见 _akshare / _openai）
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import lru_cache
+from io import StringIO
 
 # ============================================================
 # 配置区域
@@ -61,9 +72,37 @@ OWNER_EMAIL   = os.environ.get("OWNER_EMAIL", "") or os.environ.get("SMTP_USER",
 PRICE_CHANGE_THRESHOLD = 5.0  # 盘中涨跌幅阈值（%）
 VOLUME_MULTIPLIER      = 1.8  # 收盘后成交量倍数阈值
 
+# 共享 HTTP Session：PushPlus / 新浪 / Yahoo 直连请求复用 keep-alive 连接，
+# 429/5xx 自动退避重试（POST 不在 Retry 默认重试方法内，不会重复推送）
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=20, pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+# Yahoo 会按 TLS/HTTP 指纹限流普通 requests 客户端（429），
+# 有 curl_cffi 时用 Chrome 指纹的共享 Session 交给 yfinance，没有则沿用 yfinance 默认会话
+try:
+    from curl_cffi import requests as cffi_requests
+    YF_SESSION = cffi_requests.Session(impersonate="chrome")
+except ImportError:
+    YF_SESSION = None
+YAHOO_HTTP = YF_SESSION if YF_SESSION is not None else SESSION  # 直连 Yahoo 接口（spark / chart）所用会话
+
+# 进程级共享的行情抓取线程池（spark 分批、fast_info / history 兜底、周线等叶子请求）。
+# 只提交不再向本池提交子任务的叶子函数，避免嵌套等待造成死锁
+FETCH_WORKERS = 8
+FETCH_POOL    = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
 _SCRIPT_DIR        = os.path.dirname(os.path.abspath(__file__))
 ALERTED_TODAY_FILE = os.path.join(_SCRIPT_DIR, "alerted_today.json")
 STOCK_NAMES_FILE   = os.path.join(_SCRIPT_DIR, "stock_names.json")
+HISTORY_CACHE_DIR  = os.path.join(_SCRIPT_DIR, ".cache", "history")
+HISTORY_CACHE_TTL  = 3600  # 日线磁盘缓存有效期（秒），当日K线仍可能变动
+NO_DATA_FILE       = os.path.join(_SCRIPT_DIR, ".cache", "no_data.json")
+NO_DATA_TTL        = 3600  # 确认无数据的代码在此期间内不再请求（秒）
+FAIL_COOLDOWN      = 300   # 请求抛异常（超时 / 被拒）的代码短暂熔断，期间直接跳过（秒）
+NEWS_SUMMARY_DIR   = os.path.join(_SCRIPT_DIR, ".cache", "news")  # 按日期分目录的 LLM 新闻摘要
 
 
 def load_alerted_today():
@@ -91,6 +130,55 @@ def save_alerted_today(new_symbols):
         print(f"  WARNING 保存 alerted_today.json 失败: {e}")
 
 
+_NO_DATA       = None
+_NO_DATA_DIRTY = False
+_NO_DATA_LOCK  = threading.Lock()
+
+
+def _load_no_data():
+    global _NO_DATA
+    if _NO_DATA is None:
+        try:
+            with open(NO_DATA_FILE, "r", encoding="utf-8") as f:
+                _NO_DATA = json.load(f)
+        except Exception:
+            _NO_DATA = {}
+    return _NO_DATA
+
+
+def _is_no_data(key):
+    """key 近期被确认无数据（退市代码、新浪查不到的名称等）时返回 True，调用方直接跳过网络请求"""
+    with _NO_DATA_LOCK:
+        return _load_no_data().get(key, 0) > time.time()
+
+
+def _mark_no_data(key, ttl=NO_DATA_TTL):
+    """记录一次无数据结果，ttl 秒内不再重试；只改内存，运行结束时由 _flush_no_data 统一写回。
+    确认无数据用 NO_DATA_TTL，请求异常用较短的 FAIL_COOLDOWN。
+    """
+    global _NO_DATA_DIRTY
+    with _NO_DATA_LOCK:
+        _load_no_data()[key] = time.time() + ttl
+        _NO_DATA_DIRTY = True
+
+
+def _flush_no_data():
+    """清理过期条目后将无数据记录写回 no_data.json；本次运行没有新记录时不写盘"""
+    global _NO_DATA_DIRTY
+    with _NO_DATA_LOCK:
+        if not _NO_DATA_DIRTY:
+            return
+        now   = time.time()
+        cache = {k: expire for k, expire in _NO_DATA.items() if expire > now}
+        try:
+            os.makedirs(os.path.dirname(NO_DATA_FILE), exist_ok=True)
+            with open(NO_DATA_FILE, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+            _NO_DATA_DIRTY = False
+        except Exception as e:
+            print(f"  WARNING 保存 no_data.json 失败: {e}")
+
+
 US_STOCKS = [
     "GOOG", "PDD", "NIO", "TSM", "AMZN", "CRCL", "SBUX", "BKNG",
     "META", "ABNB", "DUOL", "AAPL", "UBER", "FUTU", "XNET", "NVDA",
@@ -130,6 +218,10 @@ CRYPTO_SYMBOLS = [
     "DOGE-USD", "ADA-USD", "AVAX-USD", "DOT-USD", "LINK-USD",
 ]
 
+# 原始代码 -> yfinance 代码，模块加载时一次性换算，抓取函数里直接查表
+HK_YF_MAP = {s: f"{int(s.replace('.HK', '')):04d}.HK" for s in HK_STOCKS}
+A_YF_MAP  = {s: f"{s}.SS" if s.startswith("6") else f"{s}.SZ" for s in A_STOCKS}
+
 # ============================================================
 # 推送（PushPlus）——汇总模式，一次发一条
 # ============================================================
@@ -140,10 +232,14 @@ def send_to_wechat(title, content):
         print(f"\n{'='*50}\n{title}\n{content}\n{'='*50}")
         return
     try:
-        resp = requests.post(
+        # 中文正文直接以 UTF-8 发送：json= 默认 ensure_ascii，每个汉字会膨胀成 6 字节的 \uXXXX
+        payload = json.dumps({"token": PUSHPLUS_TOKEN, "title": title,
+                              "content": content, "template": "markdown"},
+                             ensure_ascii=False).encode("utf-8")
+        resp = SESSION.post(
             "https://www.pushplus.plus/send",
-            json={"token": PUSHPLUS_TOKEN, "title": title,
-                  "content": content, "template": "markdown"},
+            data=payload,
+            headers={"Content-Type": "application/json; charset=utf-8"},
             timeout=10
         )
         data = resp.json()
@@ -155,19 +251,90 @@ def send_to_wechat(title, content):
         print(f"  FAIL 推送异常：{e}")
 
 
-def send_email(to_addr, subject, content_md):
-    """将 Markdown 内容转为 HTML 发送邮件"""
+# 有 markdown 库时用其单遍解析（支持表格，周报 Top5 为表格）；没有则退回下方的极简正则转换
+try:
+    import markdown as _markdown
+except ImportError:
+    _markdown = None
+
+_MD_H2   = re.compile(r'^## (.+)$', re.MULTILINE)
+_MD_H3   = re.compile(r'^### (.+)$', re.MULTILINE)
+_MD_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+_HTML_OPEN   = '<html><body style="font-family:sans-serif;max-width:640px;margin:0 auto;line-height:1.6">'
+_HTML_CLOSE  = '</body></html>'
+
+
+@lru_cache(maxsize=64)
+def _md_to_html(content_md):
+    """Markdown -> 邮件 HTML；同一份内容（owner 与多位用户）只渲染一次"""
+    if _markdown is not None:
+        body = _markdown.markdown(content_md.translate(_HTML_ESCAPE), extensions=["tables", "nl2br"])
+        return _HTML_OPEN + body + _HTML_CLOSE
+    html = content_md.translate(_HTML_ESCAPE)
+    html = _MD_H2.sub(r'<h2>\1</h2>', html)
+    html = _MD_H3.sub(r'<h3>\1</h3>', html)
+    html = _MD_BOLD.sub(r'<b>\1</b>', html)
+    html = html.replace('\n---\n', '<hr>')
+    html = html.replace('\n', '<br>')
+    return _HTML_OPEN + html + _HTML_CLOSE
+
+
+def _smtp_login():
+    """建立已 STARTTLS + 登录的 SMTP 连接"""
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+    try:
+        server.starttls()
+        server.login(SMTP_USER, SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+@contextmanager
+def smtp_connection():
+    """批量发信时共享一条已登录的 SMTP 连接；未配置或登录失败时产出 None（send_email 自行建连）"""
+    if not all([SMTP_USER, SMTP_PASSWORD]):
+        yield None
+        return
+    try:
+        server = _smtp_login()
+    except Exception as e:
+        print(f"  WARNING  SMTP 预连接失败，改为逐封建连: {e}")
+        yield None
+        return
+    try:
+        yield server
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+
+def _smtp_relogin(server):
+    """共享连接断开后原地重连并登录；失败则关闭该连接（保持未登录态会让后续发信全部失败），返回是否成功"""
+    try:
+        server.connect(SMTP_HOST, SMTP_PORT)
+        server.ehlo()
+        server.starttls()
+        server.login(SMTP_USER, SMTP_PASSWORD)
+        return True
+    except Exception as e:
+        print(f"  WARNING  SMTP 重连失败，本封改为单独建连: {e}")
+        server.close()
+        return False
+
+
+def send_email(to_addr, subject, content_md, server=None):
+    """将 Markdown 内容转为 HTML 发送邮件。
+    传入 server 时复用该已登录连接，否则本次单独建连并在发送后关闭。
+    """
     if not all([SMTP_USER, SMTP_PASSWORD]):
         print(f"WARNING 未配置SMTP，跳过邮件: {subject}")
         return
-    html = content_md
-    html = html.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-    html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-    html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    html = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', html)
-    html = html.replace('\n---\n', '<hr>')
-    html = html.replace('\n', '<br>')
-    html = f'<html><body style="font-family:sans-serif;max-width:640px;margin:0 auto;line-height:1.6">{html}</body></html>'
+    html = _md_to_html(content_md)
 
     try:
         msg = MIMEMultipart("alternative")
@@ -176,15 +343,42 @@ def send_email(to_addr, subject, content_md):
         msg["To"]      = to_addr
         msg.attach(MIMEText(content_md, "plain", "utf-8"))
         msg.attach(MIMEText(html, "html", "utf-8"))
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(SMTP_USER, to_addr, msg.as_string())
+        sent = False
+        if server is not None:
+            try:
+                server.sendmail(SMTP_USER, to_addr, msg.as_string())
+                sent = True
+            except smtplib.SMTPServerDisconnected:
+                # 共享连接可能已被服务端空闲断开：重新登录后重发一次
+                if _smtp_relogin(server):
+                    server.sendmail(SMTP_USER, to_addr, msg.as_string())
+                    sent = True
+        if not sent:
+            with _smtp_login() as own_server:
+                own_server.sendmail(SMTP_USER, to_addr, msg.as_string())
         print(f"  OK 邮件发送成功：{to_addr} | {subject}")
     except Exception as e:
         print(f"  FAIL 邮件发送失败：{e}")
 
 
+def _queue_email(outbox, to_addr, subject, content_md):
+    """outbox 为 None 时立即发送；否则暂存 (to_addr, subject, content_md)，由 send_outbox 统一发送"""
+    if outbox is None:
+        send_email(to_addr, subject, content_md)
+    else:
+        outbox.append((to_addr, subject, content_md))
+
+
+def send_outbox(outbox):
+    """所有报告正文生成完毕后再登录 SMTP，共享一条连接依次发出，
+    避免取数和新闻摘要的数分钟内连接被服务端空闲断开"""
+    if not outbox:
+        return
+    with smtp_connection() as server:
+        for to_addr, subject, content_md in outbox:
+            send_email(to_addr, subject, content_md, server=server)
+
+
 _USERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "users.json")
 
 def load_users():
@@ -237,27 +431,122 @@ def get_stock_name(symbol, market):
     if symbol in cache:
         return cache[symbol]
 
+    return _fetch_stock_name(symbol, market)
+
+
+_SINA_HEADERS = {"Referer": "https://finance.sina.com.cn"}
+_SINA_BATCH   = 50  # 新浪行情接口单次最多查询的代码数
+
+
+def _sina_code(symbol, market):
+    """A股 -> sh600519 / sz300750；港股 -> hk00700（新浪港股代码为 5 位）"""
+    if market == "港股":
+        return f"hk{int(symbol.replace('.HK', '')):05d}"
+    return f"{'sh' if symbol.startswith('6') else 'sz'}{symbol}"
+
+
+def _parse_sina_name(fields):
+    """从新浪行情字段串中取中文名：A股首字段即中文名，港股首字段为英文名、第二字段为中文名"""
+    for field in fields.split(",", 2)[:2]:
+        name = field.strip()
+        if any("\u4e00" <= c <= "\u9fff" for c in name):
+            return name
+    return ""
+
+
+def _iter_sina_lines(text):
+    """逐行解析 `var hq_str_sh600519="贵州茅台,...";`，产出 (代码, 字段串)"""
+    for line in text.splitlines():
+        head, sep, rest = line.partition('="')
+        if sep and "hq_str_" in head:
+            yield head.rsplit("hq_str_", 1)[1], rest.split('"', 1)[0]
+
+
+def _fetch_stock_name(symbol, market):
+    """从新浪财经查询中文名，成功则写回缓存；失败返回代码本身"""
+    if _is_no_data(f"name:{symbol}"):
+        return symbol
+
+    cache = _ensure_name_cache()
     try:
-        if market == "港股":
-            code_4d = f"{int(symbol.replace('.HK', '')):04d}"
-            url = f"https://hq.sinajs.cn/list=hk{code_4d}"
-        else:
-            prefix = "sh" if symbol.startswith("6") else "sz"
-            url = f"https://hq.sinajs.cn/list={prefix}{symbol}"
-        resp = requests.get(url, headers={"Referer": "https://finance.sina.com.cn"}, timeout=5)
-        m = re.search(r'"([^"]+)"', resp.text)
-        if m:
-            name = m.group(1).split(",")[0].strip()
-            if name and re.search(r'[\u4e00-\u9fff]', name):
-                cache[symbol] = name
-                _flush_name_cache()
-                return name
+        url  = f"https://hq.sinajs.cn/list={_sina_code(symbol, market)}"
+        resp = SESSION.get(url, headers=_SINA_HEADERS, timeout=5)
+        name = _parse_sina_name(resp.text.split('"', 2)[1])
     except Exception:
-        pass
+        # 超时 / 连接失败不代表查不到名称，只短暂熔断
+        _mark_no_data(f"name:{symbol}", FAIL_COOLDOWN)
+        return symbol
 
+    if name:
+        cache[symbol] = name
+        _flush_name_cache()
+        return name
+    _mark_no_data(f"name:{symbol}")
     return symbol
 
 
+def _cn_watchlist(users):
+    """owner 与所有用户关注的A股/港股代码合集，供批量预取中文名"""
+    symbols = A_STOCKS + HK_STOCKS
+    for user in users:
+        symbols += (user.get("a_stocks") or []) + (user.get("hk_stocks") or [])
+    return list(dict.fromkeys(symbols))
+
+
+def _prime_name_cache(symbols=None):
+    """把缓存中缺失的A股/港股名称按 50 支一组批量查询新浪并写回 stock_names.json，
+    避免在告警循环里逐支查询。symbols 默认为全局 A股 + 港股列表。
+    """
+    if symbols is None:
+        symbols = A_STOCKS + HK_STOCKS
+    cache   = _ensure_name_cache()
+    missing = {}
+    for sym in symbols:
+        if sym in cache or _is_no_data(f"name:{sym}"):
+            continue
+        market = "港股" if sym.endswith(".HK") else "A股"
+        missing[_sina_code(sym, market)] = sym
+    if not missing:
+        return
+
+    codes   = list(missing)
+    updated = False
+    for i in range(0, len(codes), _SINA_BATCH):
+        chunk = codes[i:i + _SINA_BATCH]
+        try:
+            resp = SESSION.get(f"https://hq.sinajs.cn/list={','.join(chunk)}",
+                               headers=_SINA_HEADERS, timeout=5)
+        except Exception as e:
+            print(f"  WARNING 新浪批量名称查询失败: {e}")
+            continue
+        for code, fields in _iter_sina_lines(resp.text):
+            name = _parse_sina_name(fields)
+            if name and code in missing:
+                cache[missing[code]] = name
+                updated = True
+    if updated:
+        _flush_name_cache()
+
+
+# ============================================================
+# yfinance 代码 / Ticker
+# ============================================================
+
+def _yf_symbol(symbol, market):
+    """原始代码 -> yfinance 代码：优先查预计算表，用户自定义代码现场换算"""
+    if market == "港股":
+        return HK_YF_MAP.get(symbol) or f"{int(symbol.replace('.HK', '')):04d}.HK"
+    if market == "A股":
+        return A_YF_MAP.get(symbol) or (f"{symbol}.SS" if symbol.startswith("6") else f"{symbol}.SZ")
+    return symbol  # 美股 / 加密货币：ticker 已是 yfinance 格式
+
+
+@lru_cache(maxsize=256)
+def _yf_ticker(yf_sym):
+    """同一代码在本进程内复用 Ticker 对象（共享会话，免去重复初始化）"""
+    return yf.Ticker(yf_sym, session=YF_SESSION)
+
+
 # ============================================================
 # 大盘指数
 # ============================================================
@@ -279,12 +568,19 @@ _INDEX_MAP = {
 }
 
 
+# 同一进程内 owner 与各用户的报告共用指数行情。不设过期：_yf_ticker 复用的 Ticker
+# 会记住 fast_info 的价格，进程内重取也只会拿到同一组数字
+_INDICES_MEMO = {}
+
+
 def get_market_indices(market):
     """获取大盘指数当日涨跌幅，返回 [(name, price, change_pct), ...]"""
+    if market in _INDICES_MEMO:
+        return _INDICES_MEMO[market]
     results = []
     for ticker_sym, name in _INDEX_MAP.get(market, []):
         try:
-            fi = yf.Ticker(ticker_sym).fast_info
+            fi = _yf_ticker(ticker_sym).fast_info
             price      = fi.last_price
             prev_close = fi.previous_close
             if price and prev_close and prev_close != 0:
@@ -292,6 +588,8 @@ def get_market_indices(market):
                 results.append((name, round(float(price), 2), round(float(chg), 2)))
         except Exception as e:
             print(f"  WARNING 指数 {ticker_sym} 获取失败: {e}")
+    if results:
+        _INDICES_MEMO[market] = results
     return results
 
 
@@ -310,197 +608,259 @@ def _format_indices(indices):
 # 模式一：盘中实时监控（条件1）
 # ============================================================
 
+def _akshare():
+    """按需导入 akshare（依赖多、导入耗时数秒），仅A股新闻用到；UA 补丁已在模块加载时生效"""
+    import akshare
+    return akshare
+
+
 def get_intraday_news(symbol, market):
     """盘中异动时快速获取 1-2 条最新新闻标题（纯标题，不调用 Qwen）"""
     headlines = []
     try:
         if market in ["美股", "港股", "加密货币"]:
-            yf_sym = (f"{int(symbol.replace('.HK', '')):04d}.HK"
-                      if market == "港股" else symbol)
-            for n in yf.Ticker(yf_sym).news[:2]:
+            yf_sym = _yf_symbol(symbol, market)
+            for n in (_yf_ticker(yf_sym).news or [])[:2]:
                 if "content" in n and "title" in n["content"]:
                     headlines.append(n["content"]["title"])
         elif market == "A股":
-            news_df = ak.stock_news_em(symbol=symbol)
+            news_df = _akshare().stock_news_em(symbol=symbol)
             if news_df is not None and not news_df.empty:
-                for _, row in news_df.head(2).iterrows():
-                    t = row.get("新闻标题", "")
-                    if t:
-                        headlines.append(t)
+                headlines.extend(t for t in news_df["新闻标题"].head(2).tolist() if t)
     except Exception:
         pass
     return headlines
 
 
-def get_intraday_us(symbols):
-    """并发拉取美股实时价 vs 昨日收盘"""
+_SPARK_URL   = "https://query1.finance.yahoo.com/v8/finance/spark"
+_SPARK_CHUNK = 20  # spark 接口单次最多 20 支
+
+
+def _spark_batch(yf_syms):
+    """单次请求 Yahoo spark 接口，返回 {yf_sym: (现价, 昨收, 成交量)}"""
+    try:
+        resp = YAHOO_HTTP.get(
+            _SPARK_URL,
+            params={"symbols": ",".join(yf_syms), "range": "1d", "interval": "1d"},
+            timeout=10,
+        )
+        items = resp.json()["spark"]["result"] or []
+    except Exception as e:
+        print(f"  WARNING  spark 批量行情获取失败: {e}")
+        return {}
+
+    quotes = {}
+    for item in items:
+        try:
+            meta = item["response"][0]["meta"]
+        except (KeyError, IndexError, TypeError):
+            continue
+        price      = meta.get("regularMarketPrice")
+        prev_close = meta.get("previousClose") or meta.get("chartPreviousClose")
+        if price and prev_close:
+            quotes[item.get("symbol")] = (price, prev_close, meta.get("regularMarketVolume"))
+    return quotes
+
+
+def _spark_quotes(yf_syms):
+    """按 20 支一组并发请求 spark 接口，合并为 {yf_sym: (现价, 昨收, 成交量)}"""
+    chunks = [yf_syms[i:i + _SPARK_CHUNK] for i in range(0, len(yf_syms), _SPARK_CHUNK)]
+    quotes = {}
+    for part in FETCH_POOL.map(_spark_batch, chunks):
+        quotes.update(part)
+    return quotes
+
+
+def _intraday_record(symbol, yf_sym, market, current, prev_close, volume, vol_ratio, ndigits=3):
+    change_pct = (current - prev_close) / prev_close * 100
+    return {
+        "symbol":     symbol,
+        "name":       yf_sym,
+        "yf_symbol":  yf_sym,
+        "price":      round(float(current), ndigits),
+        "prev_close": round(float(prev_close), ndigits),
+        "change_pct": round(float(change_pct), 2),
+        "volume":     volume,
+        "vol_ratio":  vol_ratio,
+        "market":     market,
+    }
+
+
+def _fetch_intraday(yf_map, market, ndigits=3):
+    """拉取实时价 vs 昨日收盘。yf_map 为 {原始代码: yfinance 代码}。
+    先走 spark 批量接口（量比留空，触发异动后再补），缺失的代码逐支用 fast_info 兜底。
+    """
+    quotes  = _spark_quotes(list(yf_map.values()))
+    results = []
+    missing = []
+    for symbol, yf_sym in yf_map.items():
+        q = quotes.get(yf_sym)
+        if q is None:
+            missing.append(symbol)
+            continue
+        current, prev_close, volume = q
+        results.append(_intraday_record(symbol, yf_sym, market, current, prev_close,
+                                        volume, None, ndigits))
+
     def _fetch(symbol):
+        yf_sym = yf_map[symbol]
         try:
-            fi = yf.Ticker(symbol).fast_info
+            fi = _yf_ticker(yf_sym).fast_info
             current    = fi.last_price
             prev_close = fi.previous_close
             if not current or not prev_close or prev_close == 0:
                 return None
-            change_pct = (current - prev_close) / prev_close * 100
             vol     = getattr(fi, "last_volume", None)
             avg_vol = getattr(fi, "three_month_average_volume", None)
             vol_ratio = round(vol / avg_vol, 2) if vol and avg_vol else None
-            return {
-                "symbol":     symbol,
-                "name":       symbol,
-                "price":      round(float(current), 3),
-                "prev_close": round(float(prev_close), 3),
-                "change_pct": round(float(change_pct), 2),
-                "vol_ratio":  vol_ratio,
-                "market":     "美股",
-            }
+            return _intraday_record(symbol, yf_sym, market, current, prev_close,
+                                    vol, vol_ratio, ndigits)
         except Exception as e:
-            print(f"  WARNING  {symbol} 实时数据获取失败: {e}")
+            print(f"  WARNING  {yf_sym} 实时数据获取失败: {e}")
             return None
 
-    results = []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(_fetch, s): s for s in symbols}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
+    if missing:
+        results.extend(r for r in FETCH_POOL.map(_fetch, missing) if r)
     return results
 
 
+def _fill_vol_ratio(stocks):
+    """spark 接口不含三月均量，只为触发异动的股票补查 fast_info 计算量比"""
+    def _fill(stock):
+        if stock.get("vol_ratio") is not None or not stock.get("volume"):
+            return
+        try:
+            avg_vol = _yf_ticker(stock["yf_symbol"]).fast_info.three_month_average_volume
+            if avg_vol:
+                stock["vol_ratio"] = round(stock["volume"] / avg_vol, 2)
+        except Exception:
+            pass
+
+    list(FETCH_POOL.map(_fill, stocks))
+
+
+def get_intraday_us(symbols):
+    """批量拉取美股实时价 vs 昨日收盘"""
+    return _fetch_intraday({s: s for s in symbols}, "美股")
+
+
 def get_intraday_hk():
-    """用 yfinance 并发拉取港股实时价。
+    """用 Yahoo Finance 批量拉取港股实时价。
     东方财富 API 屏蔽 GitHub Actions IP，改用 Yahoo Finance（全球可访问）。
     """
-    def _fetch(original):
-        yf_sym = f"{int(original.replace('.HK', '')):04d}.HK"
-        try:
-            fi = yf.Ticker(yf_sym).fast_info
-            current    = fi.last_price
-            prev_close = fi.previous_close
-            if not current or not prev_close or prev_close == 0:
-                return None
-            change_pct = (current - prev_close) / prev_close * 100
-            vol     = getattr(fi, "last_volume", None)
-            avg_vol = getattr(fi, "three_month_average_volume", None)
-            vol_ratio = round(vol / avg_vol, 2) if vol and avg_vol else None
-            return {
-                "symbol":     original,
-                "name":       yf_sym,
-                "price":      round(float(current), 3),
-                "prev_close": round(float(prev_close), 3),
-                "change_pct": round(float(change_pct), 2),
-                "vol_ratio":  vol_ratio,
-                "market":     "港股",
-            }
-        except Exception as e:
-            print(f"  WARNING  {yf_sym} 实时数据获取失败: {e}")
-            return None
-
-    results = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(_fetch, s): s for s in HK_STOCKS}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-    return results
+    return _fetch_intraday(HK_YF_MAP, "港股")
 
 
 def get_intraday_a():
-    """用 yfinance 并发拉取A股实时价。
+    """用 Yahoo Finance 批量拉取A股实时价。
     东方财富 API 屏蔽 GitHub Actions IP，改用 Yahoo Finance（全球可访问）。
     """
-    def _fetch(original):
-        yf_sym = f"{original}.SS" if original.startswith("6") else f"{original}.SZ"
-        try:
-            fi = yf.Ticker(yf_sym).fast_info
-            current    = fi.last_price
-            prev_close = fi.previous_close
-            if not current or not prev_close or prev_close == 0:
-                return None
-            change_pct = (current - prev_close) / prev_close * 100
-            vol     = getattr(fi, "last_volume", None)
-            avg_vol = getattr(fi, "three_month_average_volume", None)
-            vol_ratio = round(vol / avg_vol, 2) if vol and avg_vol else None
-            return {
-                "symbol":     original,
-                "name":       yf_sym,
-                "price":      round(float(current), 3),
-                "prev_close": round(float(prev_close), 3),
-                "change_pct": round(float(change_pct), 2),
-                "vol_ratio":  vol_ratio,
-                "market":     "A股",
-            }
-        except Exception as e:
-            print(f"  WARNING  {yf_sym} 实时数据获取失败: {e}")
-            return None
-
-    results = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(_fetch, s): s for s in A_STOCKS}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-    return results
+    return _fetch_intraday(A_YF_MAP, "A股")
 
 
 def get_intraday_crypto():
-    """用 yfinance 并发拉取加密货币实时价（24/7 全天候）"""
-    def _fetch(symbol):
-        try:
-            fi = yf.Ticker(symbol).fast_info
-            current    = fi.last_price
-            prev_close = fi.previous_close
-            if not current or not prev_close or prev_close == 0:
-                return None
-            change_pct = (current - prev_close) / prev_close * 100
-            vol     = getattr(fi, "last_volume", None)
-            avg_vol = getattr(fi, "three_month_average_volume", None)
-            vol_ratio = round(vol / avg_vol, 2) if vol and avg_vol else None
-            return {
-                "symbol":     symbol,
-                "name":       symbol,
-                "price":      round(float(current), 6),
-                "prev_close": round(float(prev_close), 6),
-                "change_pct": round(float(change_pct), 2),
-                "vol_ratio":  vol_ratio,
-                "market":     "加密货币",
-            }
-        except Exception as e:
-            print(f"  WARNING  {symbol} 实时数据获取失败: {e}")
-            return None
+    """用 Yahoo Finance 批量拉取加密货币实时价（24/7 全天候）"""
+    return _fetch_intraday({s: s for s in CRYPTO_SYMBOLS}, "加密货币", ndigits=6)
 
-    results = []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(_fetch, s): s for s in CRYPTO_SYMBOLS}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-    return results
+
+# 各市场交易时段（UTC 分钟，左闭右开），A股/港股不含午间休市
+MARKET_SESSIONS = {
+    "a":  [(90, 210), (300, 420)],   # 北京 09:30-11:30 / 13:00-15:00
+    "hk": [(90, 240), (300, 480)],   # 香港 09:30-12:00 / 13:00-16:00
+    "us": [(870, 1260)],             # 美东 09:30-16:00（按 EST，仅在 Yahoo 查询失败时兜底）
+}
+_US_PRECHECK_WINDOW = [(720, 1320)]  # 覆盖夏令时/冬令时的美股宽窗口（UTC 12:00-22:00）
+
+
+def _utc_minute():
+    now = datetime.utcnow()
+    return now.hour * 60 + now.minute
 
 
-def _is_us_regular_session():
+def _in_sessions(sessions, utc_min):
+    return any(lo <= utc_min < hi for lo, hi in sessions)
+
+
+_US_SESSION_STATE = None  # (查询时间戳, 是否正式交易时段)，60 秒内复用
+
+
+def _is_us_regular_session(utc_min=None):
     """通过 Yahoo Finance chart API 查询 SPY 的 marketState，确认美股是否处于正式交易时段。
     自动处理夏令时(EDT)、冬令时(EST)和节假日，只有 REGULAR 才返回 True。
+    响应不含 marketState 时改用 currentTradingPeriod.regular 的起止时间判断；结果缓存 60 秒。
     """
-    now = datetime.utcnow()
-    utc_min = now.hour * 60 + now.minute
-    # UTC 时间快速预判：明显不在美股窗口内（UTC 12:00-22:00）时直接返回 False，省去 API 调用
-    if not (720 <= utc_min < 1320):
+    global _US_SESSION_STATE
+    if utc_min is None:
+        utc_min = _utc_minute()
+    # UTC 时间快速预判：明显不在美股窗口内时直接返回 False，省去 API 调用
+    if not _in_sessions(_US_PRECHECK_WINDOW, utc_min):
         return False
+    if _US_SESSION_STATE and time.time() - _US_SESSION_STATE[0] < 60:
+        return _US_SESSION_STATE[1]
     try:
-        resp = requests.get(
+        resp = YAHOO_HTTP.get(
             "https://query1.finance.yahoo.com/v8/finance/chart/SPY",
             params={"interval": "1d", "range": "1d"},
             timeout=5,
         )
-        meta = resp.json()["chart"]["result"][0]["meta"]
-        return meta.get("marketState", "CLOSED") == "REGULAR"
+        meta  = resp.json()["chart"]["result"][0]["meta"]
+        state = meta.get("marketState")
+        if state:
+            is_open = state == "REGULAR"
+        else:
+            regular = meta["currentTradingPeriod"]["regular"]
+            is_open = regular["start"] <= time.time() < regular["end"]
     except Exception:
-        return 870 <= utc_min < 1260
+        is_open = _in_sessions(MARKET_SESSIONS["us"], utc_min)
+    _US_SESSION_STATE = (time.time(), is_open)
+    return is_open
+
+
+def _intraday_section(mkt_name, future, alerted_today):
+    """等待单个市场的行情结果并生成异动表格，返回 (市场名, 异动数, 正文, 代码列表)；无异动返回 None"""
+    print(f"获取{mkt_name}实时数据...")
+    stocks = future.result()
+    print(f"成功获取 {len(stocks)} 支{mkt_name}实时数据")
+
+    # 先过滤再排序：只对少量越过阈值的股票排序
+    triggered = [s for s in stocks
+                 if abs(s["change_pct"]) >= PRICE_CHANGE_THRESHOLD
+                 and s["symbol"] not in alerted_today]
+    triggered.sort(key=lambda x: abs(x["change_pct"]), reverse=True)
+    if not triggered:
+        print(f"{mkt_name}无盘中异动触发（或均已在今日推送过）")
+        return None
+    _fill_vol_ratio(triggered)
+
+    alert_lines = []
+    for stock in triggered:
+        name    = get_stock_name(stock["symbol"], stock["market"])
+        arrow   = "up" if stock["change_pct"] > 0 else "down"
+        vr      = stock.get("vol_ratio")
+        vol_str = f"{vr:.2f}x" if vr is not None else "-"
+        line = (
+            f"| [{arrow}] {name}({stock['symbol']})"
+            f" | {stock['prev_close']}"
+            f" | {stock['price']}"
+            f" | **{stock['change_pct']:+.2f}%**"
+            f" | {vol_str} |"
+        )
+        headlines = get_intraday_news(stock["symbol"], stock["market"])
+        if headlines:
+            line += "\n" + "\n".join(f"  - {h}" for h in headlines)
+        alert_lines.append(line)
+
+    now_str = datetime.now().strftime('%Y-%m-%d %H:%M')
+    content = "\n".join([
+        f"## {mkt_name}盘中异动汇总（{now_str}）",
+        f"共 **{len(alert_lines)}** 支股票涨跌幅超过 ±{PRICE_CHANGE_THRESHOLD}%",
+        "",
+        "| 股票 | 昨收 | 现价 | 涨跌幅 | 量比 |",
+        "|------|------|------|--------|------|",
+    ] + alert_lines)
+
+    print(f"{mkt_name}共 {len(alert_lines)} 条异动")
+    return mkt_name, len(alert_lines), content, [s["symbol"] for s in triggered]
 
 
 def run_intraday(market=None):
@@ -512,9 +872,9 @@ def run_intraday(market=None):
     utc_min = now_utc.hour * 60 + now_utc.minute
 
     open_status = {
-        "a":      90  <= utc_min < 420,
-        "hk":     90  <= utc_min < 480,
-        "us":     _is_us_regular_session(),
+        "a":      _in_sessions(MARKET_SESSIONS["a"], utc_min),
+        "hk":     _in_sessions(MARKET_SESSIONS["hk"], utc_min),
+        "us":     _is_us_regular_session(utc_min),
         "crypto": True,  # 加密货币 24/7
     }
     name_map  = {"a": "A股", "hk": "港股", "us": "美股", "crypto": "加密货币"}
@@ -538,293 +898,383 @@ def run_intraday(market=None):
         print("当前无开盘市场，跳过监控")
         return
 
+    if "a" in targets or "hk" in targets:
+        _prime_name_cache()
+
+    # 各开盘市场的行情互不依赖（不同主机 / 不同批次），先全部并发发出，再按顺序逐个处理
+    live = [m for m in targets if open_status.get(m, False)]
+    fetch_pool = ThreadPoolExecutor(max_workers=max(len(live), 1))
+    pending = {m: fetch_pool.submit(fetch_map[m]) for m in live}
+    fetch_pool.shutdown(wait=False)
+
+    # 整轮只读一次、写一次去重文件。单个市场取数 / 生成失败只跳过该市场，
+    # 其余市场的异动照常合并推送并记录
     alerted_today = load_alerted_today()
+    sections      = []  # [(市场名, 异动数, 正文, 代码列表)]，各市场汇总后合并成一次推送
     for mkt in targets:
         mkt_name = name_map[mkt]
-        if not open_status.get(mkt, False):
+        if mkt not in pending:
             print(f"{mkt_name}当前休市，跳过")
             continue
-
-        print(f"获取{mkt_name}实时数据...")
-        stocks = fetch_map[mkt]()
-        print(f"成功获取 {len(stocks)} 支{mkt_name}实时数据")
-
-        triggered = sorted(
-            [s for s in stocks
-             if abs(s["change_pct"]) >= PRICE_CHANGE_THRESHOLD
-             and s["symbol"] not in alerted_today],
-            key=lambda x: -abs(x["change_pct"])
-        )
-        if not triggered:
-            print(f"{mkt_name}无盘中异动触发（或均已在今日推送过）")
+        try:
+            section = _intraday_section(mkt_name, pending[mkt], alerted_today)
+        except Exception as e:
+            print(f"  WARNING  {mkt_name}盘中检测失败，跳过: {e}")
             continue
+        if section:
+            sections.append(section)
 
-        alert_lines = []
-        for stock in triggered:
-            name    = get_stock_name(stock["symbol"], stock["market"])
-            arrow   = "up" if stock["change_pct"] > 0 else "down"
-            vr      = stock.get("vol_ratio")
-            vol_str = f"{vr:.2f}x" if vr is not None else "-"
-            line = (
-                f"| [{arrow}] {name}({stock['symbol']})"
-                f" | {stock['prev_close']}"
-                f" | {stock['price']}"
-                f" | **{stock['change_pct']:+.2f}%**"
-                f" | {vol_str} |"
-            )
-            headlines = get_intraday_news(stock["symbol"], stock["market"])
-            if headlines:
-                line += "\n" + "\n".join(f"  - {h}" for h in headlines)
-            alert_lines.append(line)
-
-        now_str = datetime.now().strftime('%Y-%m-%d %H:%M')
-        content = "\n".join([
-            f"## {mkt_name}盘中异动汇总（{now_str}）",
-            f"共 **{len(alert_lines)}** 支股票涨跌幅超过 ±{PRICE_CHANGE_THRESHOLD}%",
-            "",
-            "| 股票 | 昨收 | 现价 | 涨跌幅 | 量比 |",
-            "|------|------|------|--------|------|",
-        ] + alert_lines)
-
-        send_to_wechat(
-            f"{mkt_name}盘中异动 {len(alert_lines)} 支（{now_str}）",
-            content
-        )
-        save_alerted_today([s["symbol"] for s in triggered])
-        alerted_today.update(s["symbol"] for s in triggered)
-        print(f"{mkt_name}共 {len(alert_lines)} 条异动，已汇总推送")
+    if not sections:
+        return
+    now_str = datetime.now().strftime('%Y-%m-%d %H:%M')
+    total   = sum(n for _, n, _, _ in sections)
+    if len(sections) == 1:
+        title = f"{sections[0][0]}盘中异动 {total} 支（{now_str}）"
+    else:
+        title = f"盘中异动 {total} 支：{'/'.join(m for m, _, _, _ in sections)}（{now_str}）"
+    send_to_wechat(title, "\n\n---\n\n".join(c for _, _, c, _ in sections))
+    save_alerted_today([sym for _, _, _, syms in sections for sym in syms])
+    print(f"共 {total} 条异动，已合并为一条推送")
 
 
 # ============================================================
 # 模式二/三：收盘后检测（条件2 + 条件3 + 条件4）
 # ============================================================
 
-def get_close_data_us(symbols):
-    """并发获取美股收盘价 + 历史数据（用于条件2/3/4），返回 (results, failed)"""
-    def _fetch(symbol):
-        try:
-            hist = yf.Ticker(symbol).history(period="60d")
-            if hist.empty or len(hist) < 22:
-                return None
-            current_price = float(hist["Close"].iloc[-1])
-            prev_close    = float(hist["Close"].iloc[-2])
-            current_vol   = float(hist["Volume"].iloc[-1])
-            hist_30       = hist.iloc[-31:-1]
-            avg_vol_30    = float(hist_30["Volume"].mean())
-            max_price_30  = float(hist_30["Close"].max())
-            min_price_30  = float(hist_30["Close"].min())
-            vol_ratio     = current_vol / avg_vol_30 if avg_vol_30 > 0 else 0
-            ma20          = float(hist["Close"].iloc[-20:].mean())
-            prev_ma20     = float(hist["Close"].iloc[-21:-1].mean())
-            return {
-                "symbol":     symbol,
-                "name":       symbol,
-                "price":      round(current_price, 3),
-                "prev_close": round(prev_close, 3),
-                "volume":     int(current_vol),
-                "avg_vol_30": int(avg_vol_30),
-                "vol_ratio":  round(vol_ratio, 2),
-                "max_30d":    round(max_price_30, 3),
-                "min_30d":    round(min_price_30, 3),
-                "ma20":       round(ma20, 3),
-                "prev_ma20":  round(prev_ma20, 3),
-                "market":     "美股",
-            }
-        except Exception as e:
-            print(f"  WARNING  {symbol} 收盘数据获取失败: {e}")
-            return None
+_DOWNLOAD_CHUNK = 15  # yf.download 每批代码数，单批出错只影响这一批
 
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(_fetch, s): s for s in symbols}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
-    return results, failed
 
+def _download_history(yf_syms, period):
+    """用 yf.download 按 15 支一组批量拉取多支日线，返回 {yf_sym: DataFrame}。
+    各组依次执行（yf.download 内部已多线程，且共享模块级状态，不宜并发调用）；
+    批量响应中缺失或全为空的代码不出现在结果里，由调用方逐支兜底。
+    """
+    hists = {}
+    for i in range(0, len(yf_syms), _DOWNLOAD_CHUNK):
+        hists.update(_download_chunk(yf_syms[i:i + _DOWNLOAD_CHUNK], period))
+    return hists
 
-def get_close_data_hk():
-    """获取港股收盘价 + 历史数据（yfinance），返回 (results, failed)"""
-    def _fetch(sym):
-        code_4d = f"{int(sym.replace('.HK', '')):04d}.HK"
+
+def _download_chunk(yf_syms, period):
+    try:
+        df = yf.download(
+            tickers=" ".join(yf_syms), period=period, group_by="ticker",
+            threads=True, progress=False, auto_adjust=True, session=YF_SESSION,
+        )
+    except Exception as e:
+        print(f"  WARNING  批量下载历史数据失败（{len(yf_syms)} 支）: {e}")
+        return {}
+    if df is None or df.empty:
+        return {}
+
+    hists = {}
+    for sym in yf_syms:
         try:
-            hist = yf.Ticker(code_4d).history(period="60d")
-            if hist.empty or len(hist) < 22:
-                return None
-            current_price = float(hist["Close"].iloc[-1])
-            prev_close    = float(hist["Close"].iloc[-2])
-            current_vol   = float(hist["Volume"].iloc[-1])
-            hist_30       = hist.iloc[-31:-1]
-            avg_vol_30    = float(hist_30["Volume"].mean())
-            max_price_30  = float(hist_30["Close"].max())
-            min_price_30  = float(hist_30["Close"].min())
-            vol_ratio     = current_vol / avg_vol_30 if avg_vol_30 > 0 else 0
-            ma20          = float(hist["Close"].iloc[-20:].mean())
-            prev_ma20     = float(hist["Close"].iloc[-21:-1].mean())
-            return {
-                "symbol":     sym,
-                "name":       get_stock_name(sym, "港股"),
-                "price":      round(current_price, 3),
-                "prev_close": round(prev_close, 3),
-                "volume":     int(current_vol),
-                "avg_vol_30": int(avg_vol_30),
-                "vol_ratio":  round(vol_ratio, 2),
-                "max_30d":    round(max_price_30, 3),
-                "min_30d":    round(min_price_30, 3),
-                "ma20":       round(ma20, 3),
-                "prev_ma20":  round(prev_ma20, 3),
-                "market":     "港股",
-            }
-        except Exception as e:
-            print(f"  WARNING  港股 {sym} 收盘数据获取失败: {e}")
-            return None
+            sub = df[sym] if df.columns.nlevels > 1 else df
+        except KeyError:
+            continue
+        sub = sub.dropna(subset=["Close"])
+        if not sub.empty:
+            hists[sym] = sub
+    return hists
 
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(_fetch, s): s for s in HK_STOCKS}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
-    return results, failed
+
+def _period_days(period):
+    """'60d' -> 60；无法解析的周期返回 0"""
+    try:
+        return int(period[:-1]) if period.endswith("d") else 0
+    except ValueError:
+        return 0
 
 
-def get_close_data_a():
-    """并发获取A股收盘价 + 历史数据（yfinance），返回 (results, failed)"""
-    def _fetch(code):
-        yf_sym = f"{code}.SS" if code.startswith("6") else f"{code}.SZ"
+def _session_close_utc(yf_sym):
+    """该代码所在市场当日收盘时刻（UTC 分钟）；24/7 交易的加密货币返回 None"""
+    if yf_sym.endswith("-USD"):
+        return None
+    if yf_sym.endswith(".HK"):
+        return MARKET_SESSIONS["hk"][-1][1]
+    if yf_sym.endswith((".SS", ".SZ")):
+        return MARKET_SESSIONS["a"][-1][1]
+    return MARKET_SESSIONS["us"][-1][1]
+
+
+def _history_cache_fresh(yf_sym, fetched_at):
+    """缓存按交易日划分：跨 UTC 日期即失效；抓取时所在市场已收盘（当日K线不再变动）则全天有效。
+    收盘前抓取的缓存在收盘后一律失效（当日K线不完整），收盘前则在 HISTORY_CACHE_TTL 内有效。
+    """
+    fetched = datetime.utcfromtimestamp(fetched_at)
+    if fetched.date() != datetime.utcnow().date():
+        return False
+    close_min = _session_close_utc(yf_sym)
+    if close_min is not None:
+        if fetched.hour * 60 + fetched.minute >= close_min:
+            return True
+        if _utc_minute() >= close_min:
+            return False
+    return time.time() - fetched_at < HISTORY_CACHE_TTL
+
+
+# 进程内日线缓存：{yf_sym: (fetched_at, period, hist)}。
+# 日报 owner 与多位用户的自选重叠时，同一代码只解析一次磁盘缓存
+_HIST_MEMO      = {}
+_HIST_MEMO_LOCK = threading.Lock()
+
+
+def _load_cached_history(yf_sym, period):
+    """读取磁盘缓存的日线。缓存失效或覆盖天数不足时返回 None；
+    缓存周期比请求长时按日期截取，使结果与直接请求该周期一致。
+    """
+    with _HIST_MEMO_LOCK:
+        entry = _HIST_MEMO.get(yf_sym)
+    if entry is None:
         try:
-            hist = yf.Ticker(yf_sym).history(period="60d")
-            if hist.empty or len(hist) < 22:
-                return None
-            current_price = float(hist["Close"].iloc[-1])
-            prev_close    = float(hist["Close"].iloc[-2])
-            current_vol   = float(hist["Volume"].iloc[-1])
-            hist_30       = hist.iloc[-31:-1]
-            avg_vol_30    = float(hist_30["Volume"].mean())
-            max_price_30  = float(hist_30["Close"].max())
-            min_price_30  = float(hist_30["Close"].min())
-            vol_ratio     = current_vol / avg_vol_30 if avg_vol_30 > 0 else 0
-            ma20          = float(hist["Close"].iloc[-20:].mean())
-            prev_ma20     = float(hist["Close"].iloc[-21:-1].mean())
-            return {
-                "symbol":     code,
-                "name":       get_stock_name(code, "A股"),
-                "price":      round(current_price, 3),
-                "prev_close": round(prev_close, 3),
-                "volume":     int(current_vol),
-                "avg_vol_30": int(avg_vol_30),
-                "vol_ratio":  round(vol_ratio, 2),
-                "max_30d":    round(max_price_30, 3),
-                "min_30d":    round(min_price_30, 3),
-                "ma20":       round(ma20, 3),
-                "prev_ma20":  round(prev_ma20, 3),
-                "market":     "A股",
-            }
-        except Exception as e:
-            print(f"  WARNING  A股 {code} 收盘数据获取失败: {e}")
+            entry = _read_history_file(yf_sym)
+        except Exception:
             return None
+        with _HIST_MEMO_LOCK:
+            _HIST_MEMO[yf_sym] = entry
+    fetched_at, cached_period, hist = entry
+    if not _history_cache_fresh(yf_sym, fetched_at):
+        return None
 
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(_fetch, code): code for code in A_STOCKS}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
-    return results, failed
+    days = _period_days(period)
+    if not days or _period_days(cached_period) < days or hist.empty:
+        return None
+    if cached_period != period:
+        hist = hist[hist.index > hist.index[-1] - timedelta(days=days)]
+    return hist
 
 
-def get_close_data_crypto():
-    """获取加密货币历史数据（用于条件2/3/4），返回 (results, failed)"""
-    def _fetch(symbol):
+def _history_path(yf_sym):
+    return os.path.join(HISTORY_CACHE_DIR, f"{yf_sym}.json")
+
+
+def _read_history_file(yf_sym):
+    """读取 JSON 格式的日线缓存文件 -> (fetched_at, period, hist)。
+    缓存来自共享的 Actions cache，用纯数据格式而非 pickle，内容异常时只会解析失败。
+    """
+    with open(_history_path(yf_sym), "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    hist = pd.read_json(StringIO(raw["hist"]), orient="split")
+    hist.index = pd.to_datetime(hist.index, utc=bool(raw["tz"]))
+    if raw["tz"]:
+        hist.index = hist.index.tz_convert(raw["tz"])
+    return float(raw["fetched_at"]), raw["period"], hist
+
+
+def _save_cached_history(yf_sym, period, hist):
+    entry = (time.time(), period, hist)
+    with _HIST_MEMO_LOCK:
+        _HIST_MEMO[yf_sym] = entry
+    tz = getattr(hist.index, "tz", None)
+    try:
+        os.makedirs(HISTORY_CACHE_DIR, exist_ok=True)
+        with open(_history_path(yf_sym), "w", encoding="utf-8") as f:
+            json.dump({
+                "fetched_at": entry[0],
+                "period":     period,
+                "tz":         str(tz) if tz else None,
+                "hist":       hist.to_json(orient="split", date_format="iso", double_precision=15),
+            }, f)
+    except Exception as e:
+        print(f"  WARNING  {yf_sym} 日线缓存写入失败: {e}")
+
+
+def _get_histories(yf_syms, period):
+    """拉取历史日线：先读磁盘缓存，未命中的批量下载，
+    批量结果中仍缺失的再逐支用 Ticker.history 兜底，新取到的数据写回缓存。
+    """
+    hists = {}
+    for yf_sym in yf_syms:
+        hist = _load_cached_history(yf_sym, period)
+        if hist is not None:
+            hists[yf_sym] = hist
+    to_fetch = [s for s in yf_syms
+                if s not in hists and not _is_no_data(f"history:{s}")]
+    if not to_fetch:
+        return hists
+
+    fetched = _fetch_histories(to_fetch, period)
+    for yf_sym, hist in fetched.items():
+        _save_cached_history(yf_sym, period, hist)
+    hists.update(fetched)
+    return hists
+
+
+def _fetch_histories(yf_syms, period):
+    """批量拉取历史日线；批量结果中缺失的代码再逐支用 Ticker.history 兜底"""
+    hists   = _download_history(yf_syms, period)
+    missing = [s for s in yf_syms if s not in hists]
+    if not missing:
+        return hists
+
+    def _fetch(yf_sym):
         try:
-            hist = yf.Ticker(symbol).history(period="60d")
-            if hist.empty or len(hist) < 22:
-                return None
-            current_price = float(hist["Close"].iloc[-1])
-            prev_close    = float(hist["Close"].iloc[-2])
-            current_vol   = float(hist["Volume"].iloc[-1])
-            hist_30       = hist.iloc[-31:-1]
-            avg_vol_30    = float(hist_30["Volume"].mean())
-            max_price_30  = float(hist_30["Close"].max())
-            min_price_30  = float(hist_30["Close"].min())
-            vol_ratio     = current_vol / avg_vol_30 if avg_vol_30 > 0 else 0
-            ma20          = float(hist["Close"].iloc[-20:].mean())
-            prev_ma20     = float(hist["Close"].iloc[-21:-1].mean())
-            return {
-                "symbol":     symbol,
-                "name":       symbol,
-                "price":      round(current_price, 6),
-                "prev_close": round(prev_close, 6),
-                "volume":     int(current_vol),
-                "avg_vol_30": int(avg_vol_30),
-                "vol_ratio":  round(vol_ratio, 2),
-                "max_30d":    round(max_price_30, 6),
-                "min_30d":    round(min_price_30, 6),
-                "ma20":       round(ma20, 6),
-                "prev_ma20":  round(prev_ma20, 6),
-                "market":     "加密货币",
-            }
+            return _yf_ticker(yf_sym).history(period=period)
         except Exception as e:
-            print(f"  WARNING  {symbol} 收盘数据获取失败: {e}")
+            print(f"  WARNING  {yf_sym} 历史数据获取失败: {e}")
+            _mark_no_data(f"history:{yf_sym}", FAIL_COOLDOWN)
             return None
 
+    for yf_sym, hist in zip(missing, FETCH_POOL.map(_fetch, missing)):
+        if hist is None:
+            continue  # 请求异常，已短暂熔断
+        if not hist.empty:
+            hists[yf_sym] = hist
+        else:
+            _mark_no_data(f"history:{yf_sym}")
+    return hists
+
+
+def _summarise(hist, window):
+    """一次取出 Close/Volume 的 NumPy 数组，计算最近 window 个交易日（不含当日）的统计。
+    返回 (closes, price, prev_close, current_vol, avg_vol, max_close, min_close)。
+    """
+    arr    = hist[["Close", "Volume"]].to_numpy(dtype=float)
+    closes = arr[:, 0]
+    vols   = arr[:, 1]
+    past   = closes[-window - 1:-1]
+    return (
+        closes,
+        float(closes[-1]),
+        float(closes[-2]),
+        float(vols[-1]),
+        float(np.nanmean(vols[-window - 1:-1])),
+        float(past.max()),
+        float(past.min()),
+    )
+
+
+def _close_record(hist, symbol, name, market, ndigits=3):
+    """由 60 日日线计算收盘检测所需字段（条件2/3/4），数据不足返回 None"""
+    if hist is None or len(hist) < 22:
+        return None
+    (closes, current_price, prev_close, current_vol,
+     avg_vol_30, max_price_30, min_price_30) = _summarise(hist, 30)
+    vol_ratio     = current_vol / avg_vol_30 if avg_vol_30 > 0 else 0
+    ma20          = float(closes[-20:].mean())
+    prev_ma20     = float(closes[-21:-1].mean())
+    return {
+        "symbol":     symbol,
+        "name":       name,
+        "price":      round(current_price, ndigits),
+        "prev_close": round(prev_close, ndigits),
+        "volume":     int(current_vol),
+        "avg_vol_30": int(avg_vol_30),
+        "vol_ratio":  round(vol_ratio, 2),
+        "max_30d":    round(max_price_30, ndigits),
+        "min_30d":    round(min_price_30, ndigits),
+        "ma20":       round(ma20, ndigits),
+        "prev_ma20":  round(prev_ma20, ndigits),
+        "market":     market,
+    }
+
+
+def _records_from_histories(yf_map, period, build):
+    """按 {原始代码: yf 代码} 批量拉取日线，逐支调用 build(symbol, hist) 生成记录。
+    build 返回 None（数据不足）或抛异常的代码计入失败列表，返回 (results, failed)。
+    """
+    hists = _get_histories(list(yf_map.values()), period)
+
     results, failed = [], []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(_fetch, s): s for s in CRYPTO_SYMBOLS}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
+    for symbol, yf_sym in yf_map.items():
+        try:
+            r = build(symbol, hists.get(yf_sym))
+        except Exception as e:
+            print(f"  WARNING  {yf_sym} 数据处理失败: {e}")
+            r = None
+        if r:
+            results.append(r)
+        else:
+            failed.append(symbol)
     return results, failed
 
 
+def get_close_data_us(symbols):
+    """批量获取美股收盘价 + 历史数据（用于条件2/3/4），返回 (results, failed)"""
+    return _records_from_histories(
+        {s: s for s in symbols}, "60d",
+        lambda sym, hist: _close_record(hist, sym, sym, "美股"),
+    )
+
+
+def get_close_data_hk():
+    """批量获取港股收盘价 + 历史数据（yfinance），返回 (results, failed)"""
+    return _records_from_histories(
+        HK_YF_MAP, "60d",
+        lambda sym, hist: _close_record(hist, sym, get_stock_name(sym, "港股"), "港股"),
+    )
+
+
+def get_close_data_a():
+    """批量获取A股收盘价 + 历史数据（yfinance），返回 (results, failed)"""
+    return _records_from_histories(
+        A_YF_MAP, "60d",
+        lambda code, hist: _close_record(hist, code, get_stock_name(code, "A股"), "A股"),
+    )
+
+
+def get_close_data_crypto():
+    """批量获取加密货币历史数据（用于条件2/3/4），返回 (results, failed)"""
+    return _records_from_histories(
+        {s: s for s in CRYPTO_SYMBOLS}, "60d",
+        lambda sym, hist: _close_record(hist, sym, sym, "加密货币", ndigits=6),
+    )
+
+
 def check_close_alerts(stock):
     """检查条件2（30天新高/低）+ 条件3（成交量异常）+ 条件4（MA20穿越）"""
-    triggered = []
     price      = stock["price"]
     prev_close = stock.get("prev_close")
     ma20       = stock.get("ma20")
     prev_ma20  = stock.get("prev_ma20")
 
-    if price >= stock["max_30d"]:
+    # 先只做比较，绝大多数股票当日无异动，直接返回，不拼接任何文案
+    is_high = price >= stock["max_30d"]
+    is_low  = not is_high and price <= stock["min_30d"]
+    is_vol  = stock["vol_ratio"] >= VOLUME_MULTIPLIER
+    has_ma  = prev_close is not None and ma20 is not None and prev_ma20 is not None
+    is_up   = has_ma and prev_close < prev_ma20 and price >= ma20
+    is_down = has_ma and not is_up and prev_close > prev_ma20 and price <= ma20
+    if not (is_high or is_low or is_vol or is_up or is_down):
+        return []
+
+    triggered = []
+    if is_high:
         triggered.append(f"[peak] 条件2 收盘创近30天新高：{price} >= 30日最高 {stock['max_30d']}")
-    elif price <= stock["min_30d"]:
+    elif is_low:
         triggered.append(f"[trough] 条件2 收盘创近30天新低：{price} <= 30日最低 {stock['min_30d']}")
 
-    if stock["vol_ratio"] >= VOLUME_MULTIPLIER:
+    if is_vol:
         triggered.append(
             f"[fire] 条件3 成交量异常：今日 {stock['volume']:,}，"
             f"是30日均量的 {stock['vol_ratio']:.1f} 倍（阈值 {VOLUME_MULTIPLIER}x）"
         )
 
-    if prev_close is not None and ma20 is not None and prev_ma20 is not None:
-        if prev_close < prev_ma20 and price >= ma20:
-            triggered.append(
-                f"[cross-up] 条件4 上穿MA20：昨收 {prev_close} < 昨日MA20 {prev_ma20:.3f}，"
-                f"今收 {price} >= 今日MA20 {ma20:.3f}"
-            )
-        elif prev_close > prev_ma20 and price <= ma20:
-            triggered.append(
-                f"[cross-down] 条件4 下穿MA20：昨收 {prev_close} > 昨日MA20 {prev_ma20:.3f}，"
-                f"今收 {price} <= 今日MA20 {ma20:.3f}"
-            )
+    if is_up:
+        triggered.append(
+            f"[cross-up] 条件4 上穿MA20：昨收 {prev_close} < 昨日MA20 {prev_ma20:.3f}，"
+            f"今收 {price} >= 今日MA20 {ma20:.3f}"
+        )
+    elif is_down:
+        triggered.append(
+            f"[cross-down] 条件4 下穿MA20：昨收 {prev_close} > 昨日MA20 {prev_ma20:.3f}，"
+            f"今收 {price} <= 今日MA20 {ma20:.3f}"
+        )
 
     return triggered
 
 
-def run_close_check(market):
-    """收盘后检测模式，汇总推送一条，末尾附失败列表"""
+# 收盘异动块头部模板：模块加载时定义一次，逐股 format_map(stock) 填充
+_CLOSE_BLOCK_TEMPLATE = (
+    "### {name}（{symbol}）\n"
+    "市场：{market} | 收盘价：**{price}** | MA20：{ma20}\n"
+    "近30天：{min_30d} ~ {max_30d} | 量比：{vol_ratio:.1f}x"
+)
+
+
+def _close_check_market(market):
+    """取单个市场收盘数据并逐支检测，返回 (市场名, 异动块列表, 失败列表)"""
     market_name = {"a": "A股", "hk": "港股", "us": "美股", "crypto": "加密货币"}[market]
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M')}] {market_name}收盘后检测...")
 
@@ -844,30 +1294,49 @@ def run_close_check(market):
         conditions = check_close_alerts(stock)
         if not conditions:
             continue
-        block = "\n".join([
-            f"### {stock['name']}（{stock['symbol']}）",
-            f"市场：{stock['market']} | 收盘价：**{stock['price']}** | MA20：{stock.get('ma20', '-')}",
-            f"近30天：{stock['min_30d']} ~ {stock['max_30d']} | 量比：{stock['vol_ratio']:.1f}x",
-        ] + conditions)
-        alert_blocks.append(block)
-
-    if not alert_blocks and not failed:
-        print(f"{market_name}无收盘异动触发")
-        return
+        alert_blocks.append("\n".join([_CLOSE_BLOCK_TEMPLATE.format_map(stock)] + conditions))
+    return market_name, alert_blocks, failed
 
-    now_str = datetime.now().strftime('%Y-%m-%d %H:%M')
-    sections = [
-        f"## {market_name}收盘异动汇总（{now_str}）\n共 **{len(alert_blocks)}** 支触发"
-    ] + alert_blocks
-    if failed:
-        sections.append(f"---\n**数据获取失败（{len(failed)} 支）：** {', '.join(failed)}")
 
-    content = "\n\n---\n\n".join(sections)
-    send_to_wechat(
-        f"{market_name}收盘异动 {len(alert_blocks)} 支（{now_str}）",
-        content
-    )
-    print(f"共 {len(alert_blocks)} 条异动，已汇总推送")
+def _push_close_summary(parts):
+    """parts 为 [(市场名, 异动块列表, 失败列表)]，合并成一条推送；全部无异动且无失败时不推送"""
+    parts = [p for p in parts if p[1] or p[2]]
+    if not parts:
+        return False
+
+    now_str  = datetime.now().strftime('%Y-%m-%d %H:%M')
+    sections = []
+    for market_name, alert_blocks, failed in parts:
+        sections.append(f"## {market_name}收盘异动汇总（{now_str}）\n共 **{len(alert_blocks)}** 支触发")
+        sections.extend(alert_blocks)
+        if failed:
+            sections.append(f"---\n**数据获取失败（{len(failed)} 支）：** {', '.join(failed)}")
+
+    total = sum(len(blocks) for _, blocks, _ in parts)
+    label = "/".join(name for name, _, _ in parts) if len(parts) > 1 else parts[0][0]
+    send_to_wechat(f"{label}收盘异动 {total} 支（{now_str}）", "\n\n---\n\n".join(sections))
+    print(f"共 {total} 条异动，已汇总推送")
+    return True
+
+
+def run_close_check(market):
+    """收盘后检测模式，汇总推送一条，末尾附失败列表"""
+    if market in ("a", "hk"):
+        _prime_name_cache()
+    part = _close_check_market(market)
+    if not _push_close_summary([part]):
+        print(f"{part[0]}无收盘异动触发")
+
+
+def run_close_all(markets=("a", "hk", "us")):
+    """依次检测多个市场并合并为一条推送（共用名称预取、日线缓存与推送连接）。
+    各市场顺序拉取：yf.download 共享模块级状态，不宜在多个线程里同时调用。
+    """
+    if "a" in markets or "hk" in markets:
+        _prime_name_cache()
+    parts = [_close_check_market(m) for m in markets]
+    if not _push_close_summary(parts):
+        print("各市场均无收盘异动触发")
 
 
 # ============================================================
@@ -878,45 +1347,149 @@ GATEWAY_URL     = os.environ.get("GATEWAY_URL", "http://localhost:8000/v1")
 GATEWAY_API_KEY = os.environ.get("GATEWAY_API_KEY", "dummy")
 _DASHSCOPE_URL  = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
-_qwen_client = None
+NEWS_SUMMARY_WORKERS = 8  # 日报新闻摘要并发数（新闻抓取 + LLM 调用，均为 I/O 等待）
+# 摘要线程池与 FETCH_POOL 隔离：LLM 限流等待不会占住行情抓取线程
+SUMMARY_POOL = ThreadPoolExecutor(max_workers=NEWS_SUMMARY_WORKERS, thread_name_prefix="llm")
+
+_qwen_client    = None
+_gateway_client = None
+_gateway_down   = False  # 网关连不上后本进程内直接走 DashScope，不再逐次重试
+_LLM_CLIENT_LOCK = threading.Lock()  # 摘要线程并发首次调用时只建一个客户端
+
+
+def _openai():
+    """按需导入 openai：盘中 / 收盘检测模式不加载 LLM SDK"""
+    import openai
+    return openai
+
+
+def _llm_http_client():
+    """LLM 客户端底层连接池：keep-alive 连接数与摘要并发数对齐，整轮日报复用同一批 TLS 连接"""
+    import httpx
+    # DefaultHttpxClient 保留 openai 自带的默认配置（超时、follow_redirects 等），只覆盖连接池上限
+    return _openai().DefaultHttpxClient(limits=httpx.Limits(
+        max_connections=NEWS_SUMMARY_WORKERS * 2,
+        max_keepalive_connections=NEWS_SUMMARY_WORKERS,
+    ))
+
 
 def _get_qwen_client():
     global _qwen_client
     if _qwen_client is None and DASHSCOPE_API_KEY:
-        _qwen_client = openai.OpenAI(
-            api_key=DASHSCOPE_API_KEY,
-            base_url=_DASHSCOPE_URL,
-        )
+        with _LLM_CLIENT_LOCK:
+            if _qwen_client is None:
+                _qwen_client = _openai().OpenAI(
+                    api_key=DASHSCOPE_API_KEY,
+                    base_url=_DASHSCOPE_URL,
+                    http_client=_llm_http_client(),
+                )
     return _qwen_client
 
 
+def _get_gateway_client():
+    global _gateway_client
+    if _gateway_client is None:
+        with _LLM_CLIENT_LOCK:
+            if _gateway_client is None:
+                _gateway_client = _openai().OpenAI(
+                    api_key=GATEWAY_API_KEY,
+                    base_url=GATEWAY_URL,
+                    http_client=_llm_http_client(),
+                )
+    return _gateway_client
+
+
+LLM_RATE_CALLS  = 30  # 令牌桶：每 LLM_RATE_PERIOD 秒最多 LLM_RATE_CALLS 次调用
+LLM_RATE_PERIOD = 60
+
+_llm_tokens    = float(LLM_RATE_CALLS)
+_llm_refill_ts = time.monotonic()
+_LLM_RATE_LOCK = threading.Lock()
+
+
+def _llm_acquire():
+    """取一个调用令牌；额度内立即返回，超额时只让当前线程等到下一个令牌补充"""
+    global _llm_tokens, _llm_refill_ts
+    rate = LLM_RATE_CALLS / LLM_RATE_PERIOD
+    while True:
+        with _LLM_RATE_LOCK:
+            now = time.monotonic()
+            _llm_tokens = min(LLM_RATE_CALLS, _llm_tokens + (now - _llm_refill_ts) * rate)
+            _llm_refill_ts = now
+            if _llm_tokens >= 1:
+                _llm_tokens -= 1
+                return
+            wait = (1 - _llm_tokens) / rate
+        time.sleep(wait)
+
+
 def _llm_complete(messages: list, max_tokens: int = 600, temperature: float = 0.3) -> str:
     """Call LLM via local gateway; fall back to Qwen/DashScope if gateway offline."""
+    global _gateway_down
+    _llm_acquire()
+    if not _gateway_down:
+        try:
+            resp = _get_gateway_client().chat.completions.create(
+                model="auto", messages=messages, max_tokens=max_tokens, temperature=temperature
+            )
+            return resp.choices[0].message.content.strip()
+        except _openai().APIConnectionError:
+            _gateway_down = True
+
+    client = _get_qwen_client()
+    if client is None:
+        raise RuntimeError("Gateway offline and DASHSCOPE_API_KEY not configured")
+    resp = client.chat.completions.create(
+        model="qwen-plus", messages=messages, max_tokens=max_tokens, temperature=temperature
+    )
+    return resp.choices[0].message.content.strip()
+
+
+def _summary_cache_path(symbol):
+    return os.path.join(NEWS_SUMMARY_DIR, datetime.now().strftime("%Y%m%d"), f"{symbol}.txt")
+
+
+def _load_cached_summary(symbol):
+    """读取当日已生成的新闻摘要，没有则返回 None"""
     try:
-        client = openai.OpenAI(api_key=GATEWAY_API_KEY, base_url=GATEWAY_URL)
-        resp = client.chat.completions.create(
-            model="auto", messages=messages, max_tokens=max_tokens, temperature=temperature
-        )
-        return resp.choices[0].message.content.strip()
-    except openai.APIConnectionError:
-        client = _get_qwen_client()
-        if client is None:
-            raise RuntimeError("Gateway offline and DASHSCOPE_API_KEY not configured")
-        resp = client.chat.completions.create(
-            model="qwen-plus", messages=messages, max_tokens=max_tokens, temperature=temperature
-        )
-        return resp.choices[0].message.content.strip()
+        with open(_summary_cache_path(symbol), "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _save_cached_summary(symbol, summary):
+    """写入当日摘要；首次写入当日目录时顺带删除往日目录"""
+    path    = _summary_cache_path(symbol)
+    day_dir = os.path.dirname(path)
+    try:
+        if not os.path.isdir(day_dir):
+            if os.path.isdir(NEWS_SUMMARY_DIR):
+                for old in os.listdir(NEWS_SUMMARY_DIR):
+                    if old == os.path.basename(day_dir):
+                        continue
+                    shutil.rmtree(os.path.join(NEWS_SUMMARY_DIR, old), ignore_errors=True)
+            os.makedirs(day_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(summary)
+    except OSError as e:
+        print(f"  WARNING  {symbol} 摘要缓存写入失败: {e}")
 
 
 def get_news_summary(symbol, name, market):
-    """获取股票新闻并用 Qwen 总结（最多10条新闻，含内容摘要）"""
+    """获取股票新闻并用 Qwen 总结（最多10条新闻，含内容摘要）。
+    同一股票当日只总结一次，结果按日期缓存在磁盘上，owner / 用户 / 重跑共用。
+    """
+    cached = _load_cached_summary(symbol)
+    if cached:
+        return cached
+
     news_texts = []
 
     try:
         if market in ["美股", "港股", "加密货币"]:
-            yf_sym = f"{int(symbol.replace('.HK', '')):04d}.HK" if market == "港股" else symbol
-            ticker = yf.Ticker(yf_sym)
-            for n in ticker.news[:10]:
+            yf_sym = _yf_symbol(symbol, market)
+            for n in (_yf_ticker(yf_sym).news or [])[:10]:
                 if "content" in n and "title" in n["content"]:
                     title   = n["content"]["title"]
                     summary = n["content"].get("summary", "")
@@ -925,11 +1498,12 @@ def get_news_summary(symbol, name, market):
                         text += f"\n  {summary[:300]}"
                     news_texts.append(text)
         elif market == "A股":
-            news_df = ak.stock_news_em(symbol=symbol)
+            news_df = _akshare().stock_news_em(symbol=symbol)
             if news_df is not None and not news_df.empty:
-                for _, row in news_df.head(10).iterrows():
-                    title   = row.get('新闻标题', '')
-                    content = str(row.get('新闻内容', '') or '')
+                top = news_df.head(10)
+                contents = (top["新闻内容"].fillna("").astype(str).tolist()
+                            if "新闻内容" in top.columns else [""] * len(top))
+                for title, content in zip(top["新闻标题"].tolist(), contents):
                     text = f"- {title}"
                     if content and content != 'nan':
                         text += f"\n  {content[:300]}"
@@ -951,187 +1525,123 @@ def get_news_summary(symbol, name, market):
             + "4. 行业或宏观层面的重要背景\n"
             + "用中文回答，约200-300字，条理清晰，重点突出。"
         )
-        return _llm_complete([{"role": "user", "content": prompt}])
+        summary = _llm_complete([{"role": "user", "content": prompt}])
     except Exception as e:
         print(f"  WARNING  {symbol} Qwen摘要失败: {e}")
         return "新闻摘要获取失败"
+    if summary:
+        _save_cached_summary(symbol, summary)
+    return summary
+
+
+def _daily_record(hist, symbol, name, market, ndigits=3):
+    """由近期日线计算日报字段（当日涨跌幅 + 7日量比），数据不足返回 None"""
+    if hist is None or len(hist) < 5:
+        return None
+    _, close, prev, vol, avg_vol_7, _, _ = _summarise(hist, 7)
+    change_pct = (close - prev) / prev * 100
+    vol_ratio  = vol / avg_vol_7 if avg_vol_7 > 0 else 0
+    return {
+        "symbol":     symbol,
+        "name":       name,
+        "price":      round(close, ndigits),
+        "change_pct": round(change_pct, 2),
+        "volume":     int(vol),
+        "avg_vol_7":  int(avg_vol_7),
+        "vol_ratio":  round(vol_ratio, 2),
+        "market":     market,
+    }
 
 
 def get_daily_data_us(symbols=None):
-    """并发获取美股日报数据，返回 (results, failed)"""
+    """批量获取美股日报数据，返回 (results, failed)"""
     if symbols is None:
         symbols = US_STOCKS
-
-    def _fetch(symbol):
-        try:
-            hist = yf.Ticker(symbol).history(period="15d")
-            if hist.empty or len(hist) < 5:
-                return None
-            current_price = hist["Close"].iloc[-1]
-            prev_close    = hist["Close"].iloc[-2]
-            current_vol   = hist["Volume"].iloc[-1]
-            avg_vol_7     = hist["Volume"].iloc[-8:-1].mean()
-            change_pct    = (current_price - prev_close) / prev_close * 100
-            vol_ratio     = current_vol / avg_vol_7 if avg_vol_7 > 0 else 0
-            return {
-                "symbol":     symbol,
-                "name":       symbol,
-                "price":      round(float(current_price), 3),
-                "change_pct": round(float(change_pct), 2),
-                "volume":     int(current_vol),
-                "avg_vol_7":  int(avg_vol_7),
-                "vol_ratio":  round(float(vol_ratio), 2),
-                "market":     "美股",
-            }
-        except Exception as e:
-            print(f"  WARNING  {symbol} 日报数据失败: {e}")
-            return None
-
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(_fetch, s): s for s in symbols}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
-    return results, failed
+    return _records_from_histories(
+        {s: s for s in symbols}, "15d",
+        lambda sym, hist: _daily_record(hist, sym, sym, "美股"),
+    )
 
 
 def get_daily_data_hk(stock_list=None):
-    """获取港股日报数据，返回 (results, failed)"""
+    """批量获取港股日报数据，返回 (results, failed)"""
     if stock_list is None:
         stock_list = HK_STOCKS
-
-    def _fetch(sym):
-        code_4d = f"{int(sym.replace('.HK', '')):04d}.HK"
-        try:
-            hist = yf.Ticker(code_4d).history(period="30d")
-            if hist.empty or len(hist) < 5:
-                return None
-            close      = float(hist["Close"].iloc[-1])
-            prev       = float(hist["Close"].iloc[-2])
-            change_pct = (close - prev) / prev * 100
-            vol        = float(hist["Volume"].iloc[-1])
-            avg_vol_7  = hist["Volume"].iloc[-8:-1].mean()
-            vol_ratio  = vol / avg_vol_7 if avg_vol_7 > 0 else 0
-            return {
-                "symbol":     sym,
-                "name":       get_stock_name(sym, "港股"),
-                "price":      round(close, 3),
-                "change_pct": round(change_pct, 2),
-                "volume":     int(vol),
-                "avg_vol_7":  int(avg_vol_7),
-                "vol_ratio":  round(float(vol_ratio), 2),
-                "market":     "港股",
-            }
-        except Exception as e:
-            print(f"  WARNING  港股 {sym} 历史数据失败: {e}")
-            return None
-
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(_fetch, s): s for s in stock_list}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
-    return results, failed
+    return _records_from_histories(
+        {s: _yf_symbol(s, "港股") for s in stock_list}, "20d",
+        lambda sym, hist: _daily_record(hist, sym, get_stock_name(sym, "港股"), "港股"),
+    )
 
 
 def get_daily_data_a(stock_list=None):
-    """获取A股日报数据，返回 (results, failed)"""
+    """批量获取A股日报数据，返回 (results, failed)"""
     if stock_list is None:
         stock_list = A_STOCKS
-
-    def _fetch(code):
-        yf_sym = f"{code}.SS" if code.startswith("6") else f"{code}.SZ"
-        try:
-            hist = yf.Ticker(yf_sym).history(period="30d")
-            if hist.empty or len(hist) < 5:
-                return None
-            close      = float(hist["Close"].iloc[-1])
-            prev       = float(hist["Close"].iloc[-2])
-            change_pct = (close - prev) / prev * 100
-            vol        = float(hist["Volume"].iloc[-1])
-            avg_vol_7  = hist["Volume"].iloc[-8:-1].mean()
-            vol_ratio  = vol / avg_vol_7 if avg_vol_7 > 0 else 0
-            return {
-                "symbol":     code,
-                "name":       get_stock_name(code, "A股"),
-                "price":      round(close, 3),
-                "change_pct": round(change_pct, 2),
-                "volume":     int(vol),
-                "avg_vol_7":  int(avg_vol_7),
-                "vol_ratio":  round(float(vol_ratio), 2),
-                "market":     "A股",
-            }
-        except Exception as e:
-            print(f"  WARNING  A股 {code} 历史数据失败: {e}")
-            return None
-
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(_fetch, code): code for code in stock_list}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
-    return results, failed
+    return _records_from_histories(
+        {c: _yf_symbol(c, "A股") for c in stock_list}, "20d",
+        lambda code, hist: _daily_record(hist, code, get_stock_name(code, "A股"), "A股"),
+    )
 
 
 def get_daily_data_crypto(stock_list=None):
-    """获取加密货币日报数据，返回 (results, failed)"""
+    """批量获取加密货币日报数据，返回 (results, failed)"""
     if stock_list is None:
         stock_list = CRYPTO_SYMBOLS
+    return _records_from_histories(
+        {s: s for s in stock_list}, "10d",
+        lambda sym, hist: _daily_record(hist, sym, sym, "加密货币", ndigits=6),
+    )
 
-    def _fetch(symbol):
-        try:
-            hist = yf.Ticker(symbol).history(period="30d")
-            if hist.empty or len(hist) < 5:
-                return None
-            close      = float(hist["Close"].iloc[-1])
-            prev       = float(hist["Close"].iloc[-2])
-            change_pct = (close - prev) / prev * 100
-            vol        = float(hist["Volume"].iloc[-1])
-            avg_vol_7  = hist["Volume"].iloc[-8:-1].mean()
-            vol_ratio  = vol / avg_vol_7 if avg_vol_7 > 0 else 0
-            return {
-                "symbol":     symbol,
-                "name":       symbol,
-                "price":      round(close, 6),
-                "change_pct": round(change_pct, 2),
-                "volume":     int(vol),
-                "avg_vol_7":  int(avg_vol_7),
-                "vol_ratio":  round(float(vol_ratio), 2),
-                "market":     "加密货币",
-            }
-        except Exception as e:
-            print(f"  WARNING  {symbol} 历史数据失败: {e}")
-            return None
 
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(_fetch, s): s for s in stock_list}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
+_SUMMARY_MEMO = {}  # (market, symbol) -> 摘要；owner 与用户自选重叠的股票只总结一次
+_SUMMARY_LOCK = threading.Lock()
+
+
+def _news_summaries(stocks):
+    """并发获取新闻摘要，返回 {symbol: 摘要}；本进程内已总结过的股票直接复用"""
+    summaries, todo = {}, []
+    with _SUMMARY_LOCK:
+        for s in stocks:
+            key = (s["market"], s["symbol"])
+            if key in _SUMMARY_MEMO:
+                summaries[s["symbol"]] = _SUMMARY_MEMO[key]
             else:
-                failed.append(futures[future])
-    return results, failed
+                todo.append(s)
+    if not todo:
+        return summaries
+
+    print(f"  并发获取 {len(todo)} 支新闻摘要（复用 {len(summaries)} 支）...")
+    fs = {
+        SUMMARY_POOL.submit(get_news_summary, s["symbol"], s["name"], s["market"]): s
+        for s in todo
+    }
+    for f in as_completed(fs):
+        s = fs[f]
+        try:
+            summary = f.result()
+        except Exception:
+            summaries[s["symbol"]] = "新闻摘要获取失败"
+            continue
+        summaries[s["symbol"]] = summary
+        with _SUMMARY_LOCK:
+            _SUMMARY_MEMO[(s["market"], s["symbol"])] = summary
+    return summaries
+
 
+_DAILY_BLOCK_TEMPLATE = (
+    "### [{arrow}] {name}（{symbol}）\n"
+    "收盘价：**{price}** | 涨跌幅：**{change_pct:+.2f}%**\n"
+    "今日成交量：{volume:,} | 7日均量：{avg_vol_7:,} | 量比：{vol_ratio:.2f}x\n"
+    "**新闻摘要：** {summary}"
+)
 
-def run_daily_report(market, user=None):
+
+def run_daily_report(market, user=None, outbox=None):
     """
     日报模式：大盘指数 + 个股（并发获取新闻摘要）+ 失败列表。
     user=None  → owner，使用全局股票列表，通过 PushPlus 推送微信
     user=dict  → 外部用户，使用其自定义列表，通过 Email 推送
+    outbox     → 传入列表时邮件暂存其中，由调用方生成完全部报告后统一发送
     """
     market_name = {"a": "A股", "hk": "港股", "us": "美股", "crypto": "加密货币"}[market]
     tag = f"（{user['name']}）" if user else ""
@@ -1163,20 +1673,7 @@ def run_daily_report(market, user=None):
 
     stocks = sorted(stocks, key=lambda x: -x["change_pct"])
 
-    # 并发获取所有新闻摘要
-    print(f"  并发获取 {len(stocks)} 支{market_name}新闻摘要...")
-    summaries = {}
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        fs = {
-            executor.submit(get_news_summary, s["symbol"], s["name"], s["market"]): s["symbol"]
-            for s in stocks
-        }
-        for f in as_completed(fs):
-            sym = fs[f]
-            try:
-                summaries[sym] = f.result()
-            except Exception:
-                summaries[sym] = "新闻摘要获取失败"
+    summaries = _news_summaries(stocks)
 
     # 大盘指数 + 宏观参考
     indices      = get_market_indices(market)
@@ -1184,16 +1681,14 @@ def run_daily_report(market, user=None):
     macro        = get_market_indices("macro")
     macro_line   = _format_indices(macro)
 
-    blocks = []
-    for stock in stocks:
-        arrow = "up" if stock["change_pct"] >= 0 else "down"
-        block = "\n".join([
-            f"### [{arrow}] {stock['name']}（{stock['symbol']}）",
-            f"收盘价：**{stock['price']}** | 涨跌幅：**{stock['change_pct']:+.2f}%**",
-            f"今日成交量：{stock['volume']:,} | 7日均量：{stock['avg_vol_7']:,} | 量比：{stock['vol_ratio']:.2f}x",
-            f"**新闻摘要：** {summaries.get(stock['symbol'], '-')}",
-        ])
-        blocks.append(block)
+    blocks = [
+        _DAILY_BLOCK_TEMPLATE.format_map(dict(
+            stock,
+            arrow="up" if stock["change_pct"] >= 0 else "down",
+            summary=summaries.get(stock["symbol"], "-"),
+        ))
+        for stock in stocks
+    ]
 
     now_str  = datetime.now().strftime('%Y-%m-%d %H:%M')
     title    = f"{market_name}日报 {datetime.now().strftime('%Y-%m-%d')}"
@@ -1210,81 +1705,88 @@ def run_daily_report(market, user=None):
     content = "\n\n---\n\n".join(sections)
 
     if user:
-        send_email(user["email"], title, content)
+        _queue_email(outbox, user["email"], title, content)
     else:
         send_to_wechat(title, content)
         if OWNER_EMAIL:
-            send_email(OWNER_EMAIL, title, content)
+            _queue_email(outbox, OWNER_EMAIL, title, content)
 
     print(f"{market_name}日报已推送{tag}，共 {len(stocks)} 支，失败 {len(failed)} 支")
 
 
 def run_daily_report_all(market):
-    """依次为 owner 和 users.json 中所有用户生成并推送日报"""
-    run_daily_report(market)
-    for user in load_users():
-        run_daily_report(market, user=user)
+    """依次为 owner 和 users.json 中所有用户生成并推送日报。
+    先对 owner 与全部用户自选的并集统一取数、并发总结新闻，
+    之后逐份生成报告时只命中进程内日线 / 摘要缓存，不再重复请求。
+    """
+    users = load_users()
+    if market in ("a", "hk"):
+        _prime_name_cache(_cn_watchlist(users))
+
+    default_list, fetch = {
+        "a":      (A_STOCKS,       get_daily_data_a),
+        "hk":     (HK_STOCKS,      get_daily_data_hk),
+        "us":     (US_STOCKS,      get_daily_data_us),
+        "crypto": (CRYPTO_SYMBOLS, get_daily_data_crypto),
+    }[market]
+    union = list(default_list)
+    for user in users:
+        union += user.get(f"{market}_stocks") or []
+    union = list(dict.fromkeys(union))
+    if len(union) > len(default_list):
+        stocks, _ = fetch(union)
+        _news_summaries(stocks)
+
+    outbox = []
+    run_daily_report(market, outbox=outbox)
+    for user in users:
+        run_daily_report(market, user=user, outbox=outbox)
+    send_outbox(outbox)
 
 
 # ============================================================
 # 模式七/八/九：周报（每周五）
 # ============================================================
 
+def _weekly_record(hist, symbol, name, market):
+    """由近期日线计算本周（最近5个交易日）涨跌幅与高低点，数据不足返回 None"""
+    if hist is None or len(hist) < 5:
+        return None
+    arr        = hist[["Close", "High", "Low"]].to_numpy(dtype=float)[-5:]
+    week_open  = float(arr[0, 0])
+    week_close = float(arr[-1, 0])
+    week_high  = float(arr[:, 1].max())
+    week_low   = float(arr[:, 2].min())
+    week_chg   = (week_close - week_open) / week_open * 100
+    return {
+        "symbol":          symbol,
+        "name":            name,
+        "week_open":       round(week_open, 3),
+        "week_close":      round(week_close, 3),
+        "week_high":       round(week_high, 3),
+        "week_low":        round(week_low, 3),
+        "week_change_pct": round(week_chg, 2),
+        "market":          market,
+    }
+
+
 def get_weekly_data(symbols, market):
     """
-    获取本周涨跌幅（最近5个交易日）。
+    获取本周涨跌幅（最近5个交易日），与收盘检测 / 日报共用批量下载与日线缓存。
     返回 (results, failed)，每条包含 symbol/name/week_open/week_close/week_change_pct。
     market 为中文字符串："A股"/"港股"/"美股"/"加密货币"
     """
-    def _to_yf(sym):
-        if market == "A股":
-            return f"{sym}.SS" if sym.startswith("6") else f"{sym}.SZ"
-        elif market == "港股":
-            return f"{int(sym.replace('.HK', '')):04d}.HK"
-        return sym  # 美股 / 加密货币：ticker 已是 yfinance 格式
-
-    def _fetch(sym):
-        yf_sym = _to_yf(sym)
-        try:
-            hist = yf.Ticker(yf_sym).history(period="10d")
-            if hist.empty or len(hist) < 5:
-                return None
-            week_open  = float(hist["Close"].iloc[-5])
-            week_close = float(hist["Close"].iloc[-1])
-            week_high  = float(hist["High"].iloc[-5:].max())
-            week_low   = float(hist["Low"].iloc[-5:].min())
-            week_chg   = (week_close - week_open) / week_open * 100
-            return {
-                "symbol":          sym,
-                "name":            get_stock_name(sym, market),
-                "week_open":       round(week_open, 3),
-                "week_close":      round(week_close, 3),
-                "week_high":       round(week_high, 3),
-                "week_low":        round(week_low, 3),
-                "week_change_pct": round(week_chg, 2),
-                "market":          market,
-            }
-        except Exception as e:
-            print(f"  WARNING  {yf_sym} 周数据失败: {e}")
-            return None
-
-    workers = 8 if market in ["美股", "加密货币"] else 5
-    results, failed = [], []
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(_fetch, s): s for s in symbols}
-        for future in as_completed(futures):
-            r = future.result()
-            if r:
-                results.append(r)
-            else:
-                failed.append(futures[future])
-    return results, failed
+    return _records_from_histories(
+        {s: _yf_symbol(s, market) for s in symbols}, "15d",
+        lambda sym, hist: _weekly_record(hist, sym, get_stock_name(sym, market), market),
+    )
 
 
-def run_weekly_report(market, user=None):
+def run_weekly_report(market, user=None, outbox=None):
     """
     周报：今日大盘 + 本周涨幅 Top5 / 跌幅 Top5。
     user=None → owner (PushPlus)，user=dict → Email
+    outbox    → 传入列表时邮件暂存其中，由调用方统一发送
     """
     market_name = {"a": "A股", "hk": "港股", "us": "美股", "crypto": "加密货币"}[market]
     tag = f"（{user['name']}）" if user else ""
@@ -1310,9 +1812,8 @@ def run_weekly_report(market, user=None):
         print(f"{market_name}无周报数据{tag}")
         return
 
-    stocks_sorted = sorted(stocks, key=lambda x: -x["week_change_pct"])
-    top_gainers   = stocks_sorted[:5]
-    top_losers    = stocks_sorted[-5:][::-1]
+    top_gainers = heapq.nlargest(5, stocks, key=lambda x: x["week_change_pct"])
+    top_losers  = heapq.nsmallest(5, stocks, key=lambda x: x["week_change_pct"])
 
     table_header = (
         "| 股票 | 周初收盘 | 周末收盘 | 周涨跌幅 | 周振幅 |\n"
@@ -1347,20 +1848,25 @@ def run_weekly_report(market, user=None):
     content = "\n\n".join(sections)
 
     if user:
-        send_email(user["email"], title, content)
+        _queue_email(outbox, user["email"], title, content)
     else:
         send_to_wechat(title, content)
         if OWNER_EMAIL:
-            send_email(OWNER_EMAIL, title, content)
+            _queue_email(outbox, OWNER_EMAIL, title, content)
 
     print(f"{market_name}周报已推送{tag}，共 {len(stocks)} 支，失败 {len(failed)} 支")
 
 
 def run_weekly_report_all(market):
     """依次为 owner 和所有 users.json 用户生成并推送周报"""
-    run_weekly_report(market)
-    for user in load_users():
-        run_weekly_report(market, user=user)
+    users = load_users()
+    if market in ("a", "hk"):
+        _prime_name_cache(_cn_watchlist(users))
+    outbox = []
+    run_weekly_report(market, outbox=outbox)
+    for user in users:
+        run_weekly_report(market, user=user, outbox=outbox)
+    send_outbox(outbox)
 
 
 # ============================================================
@@ -1370,40 +1876,45 @@ def run_weekly_report_all(market):
 if __name__ == "__main__":
     mode = sys.argv[1] if len(sys.argv) > 1 else "intraday"
 
-    if mode == "intraday":
-        run_intraday()
-    elif mode == "intraday_a":
-        run_intraday("a")
-    elif mode == "intraday_hk":
-        run_intraday("hk")
-    elif mode == "intraday_us":
-        run_intraday("us")
-    elif mode == "intraday_crypto":
-        run_intraday("crypto")
-    elif mode == "close_a":
-        run_close_check("a")
-    elif mode == "close_hk":
-        run_close_check("hk")
-    elif mode == "close_us":
-        run_close_check("us")
-    elif mode == "close_crypto":
-        run_close_check("crypto")
-    elif mode == "daily_a":
-        run_daily_report_all("a")
-    elif mode == "daily_hk":
-        run_daily_report_all("hk")
-    elif mode == "daily_us":
-        run_daily_report_all("us")
-    elif mode == "daily_crypto":
-        run_daily_report_all("crypto")
-    elif mode == "weekly_a":
-        run_weekly_report_all("a")
-    elif mode == "weekly_hk":
-        run_weekly_report_all("hk")
-    elif mode == "weekly_us":
-        run_weekly_report_all("us")
-    elif mode == "weekly_crypto":
-        run_weekly_report_all("crypto")
-    else:
-        print(f"未知模式：{mode}，可选：intraday / close_a/hk/us/crypto / daily_a/hk/us/crypto / weekly_a/hk/us/crypto")
-        sys.exit(1)
+    try:
+        if mode == "intraday":
+            run_intraday()
+        elif mode == "intraday_a":
+            run_intraday("a")
+        elif mode == "intraday_hk":
+            run_intraday("hk")
+        elif mode == "intraday_us":
+            run_intraday("us")
+        elif mode == "intraday_crypto":
+            run_intraday("crypto")
+        elif mode == "close_a":
+            run_close_check("a")
+        elif mode == "close_hk":
+            run_close_check("hk")
+        elif mode == "close_us":
+            run_close_check("us")
+        elif mode == "close_crypto":
+            run_close_check("crypto")
+        elif mode == "close_all":
+            run_close_all()
+        elif mode == "daily_a":
+            run_daily_report_all("a")
+        elif mode == "daily_hk":
+            run_daily_report_all("hk")
+        elif mode == "daily_us":
+            run_daily_report_all("us")
+        elif mode == "daily_crypto":
+            run_daily_report_all("crypto")
+        elif mode == "weekly_a":
+            run_weekly_report_all("a")
+        elif mode == "weekly_hk":
+            run_weekly_report_all("hk")
+        elif mode == "weekly_us":
+            run_weekly_report_all("us")
+        elif mode == "weekly_crypto":
+            run_weekly_report_all("crypto")
+        else:
+            print(f"未知模式：{mode}，可选：intraday / close_a/hk/us/crypto / close_all / daily_a/hk/us/crypto / weekly_a/hk/us/crypto")
+            sys.exit(1)
+    finally:
+        _flush_no_data()  # 本次运行新增的无数据记录统一落盘一次